@@ -1,32 +1,126 @@
 #!/usr/bin/env python3
 
 import argparse
+import functools
 import bibtexparser
-import requests
+from bibtexparser.bibdatabase import BibDatabase, UndefinedString, as_text
+from bibtexparser.bparser import BibTexParser
+import requests_cache
 import csv
 import time
-from typing import Dict, List, Optional, Tuple, Set
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple, Set
 import logging
 from urllib.parse import quote
 from requests.exceptions import RequestException, Timeout, TooManyRedirects
 import random
-from Levenshtein import ratio, distance
+from collections import OrderedDict, defaultdict
+from rapidfuzz.distance import Indel
+from rapidfuzz.fuzz import ratio as _rf_ratio
 import re
 import json
 import os
+import queue
+import threading
+import string
+import unicodedata
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the stdlib parser
+    orjson = None
+
+# Longest normalized title prefix used for title comparison
+MAX_TITLE_LENGTH = 512
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+# Same characters _PUNCT_RE strips from ASCII text (\w keeps "_")
+_PUNCT_TRANSLATE = {ord(c): None for c in string.punctuation if c != "_"}
+
+
+def _json_loads(content: bytes):
+    """Parse a JSON response body, using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def _json_dumps_indented(obj) -> str:
+    """Pretty-print an object as JSON for debug logging."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(obj, indent=2)
+
+
+def ratio(s1: str, s2: str, score_cutoff: float = 0.0) -> float:
+    """Normalized Levenshtein (Indel) similarity in [0, 1]."""
+    return _rf_ratio(s1, s2, score_cutoff=score_cutoff * 100) / 100.0
+
+
+def _trim_common_affixes(s1: str, s2: str) -> Tuple[str, str]:
+    """Strip the common prefix and suffix shared by two strings."""
+    n = min(len(s1), len(s2))
+    i = 0
+    while i < n and s1[i] == s2[i]:
+        i += 1
+    j = 0
+    while j < n - i and s1[-1 - j] == s2[-1 - j]:
+        j += 1
+    return s1[i : len(s1) - j], s2[i : len(s2) - j]
+
+
+def _iter_author_texts(node) -> Iterator[str]:
+    """Yield author names from DBLP's polymorphic authors payload."""
+    if node is None:
+        return
+    if isinstance(node, str):
+        for name in node.split(" and "):
+            if name.strip():
+                yield name
+    elif isinstance(node, dict):
+        if "text" in node:
+            yield from _iter_author_texts(node["text"])
+        else:
+            for value in node.values():
+                yield from _iter_author_texts(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _iter_author_texts(value)
+    else:
+        logging.warning(f"Unexpected author type: {type(node)}")
+
+
+class _LookupFailed(Exception):
+    """A DBLP lookup failed after all retries."""
 
 
 class DBLPSearcher:
     def __init__(
-        self, timeout: int = 30, max_retries: int = 3, initial_delay: float = 1.0
+        self,
+        timeout: int = 30,
+        max_retries: int = 3,
+        initial_delay: float = 1.0,
+        cache_name: str = "dblp_cache",
+        request_delay: float = 0.5,
     ):
         self.base_url = "https://dblp.org/search/publ/api"
-        self.session = requests.Session()
+        # Persist DBLP responses on disk so reruns don't hit the network again
+        self.session = requests_cache.CachedSession(
+            cache_name, backend="sqlite", expire_after=86400 * 30
+        )
+        self.request_delay = request_delay
+        # Query DBLP once per distinct query string within a run; concurrent
+        # duplicates share one Future and only successful lookups are kept
+        self._query_lock = threading.Lock()
+        self._query_futures: "OrderedDict[str, Future]" = OrderedDict()
+        self._query_cache_size = 4096
         self.timeout = timeout
         self.max_retries = max_retries
         self.initial_delay = initial_delay
 
-    def _normalize_name(self, name: str) -> str:
+    @staticmethod
+    @functools.lru_cache(maxsize=8192)
+    def _normalize_name(name: str) -> str:
         """Normalize author name for comparison."""
         # Handle "Last, First" format first
         if "," in name:
@@ -35,27 +129,32 @@ class DBLPSearcher:
                 last, first = parts
                 name = f"{first.strip()} {last.strip()}"
 
-        # Remove special characters and extra whitespace
-        name = re.sub(r"[^\w\s]", "", name.lower())
-        name = " ".join(name.split())
+        # Fold accents ("Köpf" -> "Kopf") so both spellings compare equal
+        name = unicodedata.normalize("NFKD", name.lower())
+        name = "".join(c for c in name if not unicodedata.combining(c))
 
-        # Handle initials and numbers
+        # Remove special characters, then split once on whitespace
+        if name.isascii():
+            name = name.translate(_PUNCT_TRANSLATE)
+        else:
+            name = _PUNCT_RE.sub("", name)
         parts = name.split()
-        normalized_parts = []
-        for part in parts:
-            # Skip numbers (like "0003", "0004", etc.)
-            if part.isdigit():
-                continue
-            # Keep single initials
-            if len(part) == 1:
-                normalized_parts.append(part)
-            else:
-                normalized_parts.append(part)
 
-        return " ".join(normalized_parts)
+        # Skip numbers (like "0003", "0004", etc.), keep names and initials
+        return " ".join(part for part in parts if not part.isdigit())
+
+    @staticmethod
+    def _author_signature(norm_authors: List[str]) -> Set[Tuple[str, str]]:
+        """Build a set of (first initial, last name) tokens for normalized names."""
+        signature = set()
+        for name in norm_authors:
+            parts = name.split()
+            if parts:
+                signature.add((parts[0][0], parts[-1]))
+        return signature
 
     def _compare_authors(self, authors1: List[str], authors2: List[str]) -> float:
-        """Compare two lists of authors using Levenshtein distance."""
+        """Compare two lists of authors by greedily pairing the most similar names."""
         if not authors1 or not authors2:
             return 0.0
 
@@ -63,35 +162,81 @@ class DBLPSearcher:
         norm_authors1 = [self._normalize_name(a) for a in authors1]
         norm_authors2 = [self._normalize_name(a) for a in authors2]
 
+        return self._compare_authors_norm(norm_authors1, norm_authors2)
+
+    @staticmethod
+    def _best_candidate(
+        name: str, candidates: List[int], norm_authors: List[str]
+    ) -> Tuple[float, int]:
+        """Return the best (similarity, index) for name among the candidates."""
+        best_similarity = 0.0
+        best_j = -1
+        for j in candidates:
+            similarity = ratio(name, norm_authors[j], score_cutoff=0.7)
+            if similarity > best_similarity:
+                best_similarity = similarity
+                best_j = j
+        return best_similarity, best_j
+
+    def _compare_authors_norm(
+        self, norm_authors1: List[str], norm_authors2: List[str]
+    ) -> float:
+        """Compare two lists of already normalized author names."""
+        if not norm_authors1 or not norm_authors2:
+            return 0.0
+
         # Log normalized names for debugging
         logging.debug(f"Normalized authors1: {norm_authors1}")
         logging.debug(f"Normalized authors2: {norm_authors2}")
 
-        # Calculate similarity scores for each pair
+        # Accept right away if the leading authors already agree on
+        # first initial + last name (the query anchors on them anyway)
+        sig1 = self._author_signature(norm_authors1[:5])
+        sig2 = self._author_signature(norm_authors2[:5])
+        if sig1 and len(sig1 & sig2) / max(1, len(sig1 | sig2)) >= 0.8:
+            logging.debug("Leading authors match, skipping pairwise comparison")
+            return 1.0
+
+        # Index the second list by last name so each author is only scored
+        # against the names that share it
+        last_name_index = defaultdict(list)
+        for j, a2 in enumerate(norm_authors2):
+            if a2:
+                last_name_index[a2.split()[-1]].append(j)
+
+        col_used = [False] * len(norm_authors2)
         total_similarity = 0.0
-        matched_indices = set()
 
         # For each author in the first list
-        for i, a1 in enumerate(norm_authors1):
-            best_similarity = 0.0
-            best_j = -1
-
-            # Find the best matching author in the second list
-            for j, a2 in enumerate(norm_authors2):
-                if j in matched_indices:
-                    continue
+        for a1 in norm_authors1:
+            if all(col_used):
+                break
+
+            # Score the unmatched authors sharing the last name first
+            parts = a1.split()
+            candidates = [
+                j
+                for j in last_name_index.get(parts[-1] if parts else "", ())
+                if not col_used[j]
+            ]
+            best_similarity, best_j = self._best_candidate(
+                a1, candidates, norm_authors2
+            )
 
-                # Calculate similarity between the two names
-                similarity = ratio(a1, a2)
+            if best_similarity <= 0.7:
+                # Nothing in the last-name bucket matched, try all remaining ones
+                others = [
+                    j
+                    for j, used in enumerate(col_used)
+                    if not used and j not in candidates
+                ]
+                similarity, j = self._best_candidate(a1, others, norm_authors2)
                 if similarity > best_similarity:
-                    best_similarity = similarity
-                    best_j = j
+                    best_similarity, best_j = similarity, j
 
             # If we found a good match, add it to the total
-            if (
-                best_j != -1 and best_similarity > 0.7
-            ):  # Threshold for considering a match
-                matched_indices.add(best_j)
+            if best_j != -1 and best_similarity > 0.7:  # Threshold for a match
+                col_used[best_j] = True
                 total_similarity += best_similarity
                 logging.debug(
                     f"Matched '{a1}' with '{norm_authors2[best_j]}' (similarity: {best_similarity:.2f})"
@@ -105,10 +250,12 @@ class DBLPSearcher:
 
         return total_similarity / min_len
 
-    def _normalize_title(self, title: str) -> str:
+    @staticmethod
+    @functools.lru_cache(maxsize=8192)
+    def _normalize_title(title: str) -> str:
         """Normalize title for comparison."""
         # Remove special characters and extra whitespace
-        title = re.sub(r"[^\w\s]", "", title.lower())
+        title = _PUNCT_RE.sub("", title.lower())
         title = " ".join(title.split())
         return title
 
@@ -125,8 +272,29 @@ class DBLPSearcher:
         logging.debug(f"Normalized title1: {norm_title1}")
         logging.debug(f"Normalized title2: {norm_title2}")
 
-        # Calculate similarity using Levenshtein ratio
-        similarity = ratio(norm_title1, norm_title2)
+        # Cap the compared length so pasted abstracts can't blow up the DP;
+        # a 512 character prefix is plenty to tell titles apart
+        norm_title1 = norm_title1[:MAX_TITLE_LENGTH]
+        norm_title2 = norm_title2[:MAX_TITLE_LENGTH]
+
+        # Titles whose lengths differ too much can never reach the threshold
+        # (the best possible ratio is 2 * min(l1, l2) / (l1 + l2))
+        l1, l2 = len(norm_title1), len(norm_title2)
+        if l1 == 0 or l2 == 0 or min(l1, l2) * 20 < (l1 + l2) * 7:
+            logging.debug("Title lengths too different, skipping comparison")
+            return 0.0
+
+        # Common prefixes/suffixes don't change the edit distance, so only
+        # run the DP on the differing middle parts
+        a, b = _trim_common_affixes(norm_title1, norm_title2)
+        if not a and not b:
+            return 1.0
+
+        # Same metric as ratio(): 1 - indel distance / total length, with
+        # the distance capped so rapidfuzz can stop below the threshold
+        max_distance = (l1 + l2) * 3 // 10
+        raw = Indel.distance(a, b, score_cutoff=max_distance)
+        similarity = 1 - raw / (l1 + l2) if raw <= max_distance else 0.0
         logging.debug(f"Title similarity: {similarity:.2f}")
 
         return similarity
@@ -141,7 +309,17 @@ class DBLPSearcher:
                     self.base_url, params=params, timeout=self.timeout
                 )
                 response.raise_for_status()
-                return response.json()
+
+                # Add a small delay to avoid overwhelming the API, unless
+                # the response was served from the local cache
+                if not getattr(response, "from_cache", False):
+                    time.sleep(self.request_delay)
+
+                try:
+                    return _json_loads(response.content)
+                except ValueError as e:  # Not JSON (e.g. a maintenance page)
+                    logging.error(f"Invalid JSON in DBLP response: {e}")
+                    return None
 
             except Timeout:
                 logging.warning(
@@ -171,129 +349,142 @@ class DBLPSearcher:
 
         return None
 
+    def _query_dblp(self, query: str) -> Dict:
+        """Query DBLP once per distinct query string, even across threads."""
+        with self._query_lock:
+            future = self._query_futures.get(query)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._query_futures[query] = future
+                if len(self._query_futures) > self._query_cache_size:
+                    self._query_futures.popitem(last=False)
+            else:
+                self._query_futures.move_to_end(query)
+
+        if owner:
+            try:
+                future.set_result(self._query_dblp_uncached(query))
+            except BaseException as e:
+                # Don't cache failures, the next duplicate query tries again
+                with self._query_lock:
+                    if self._query_futures.get(query) is future:
+                        del self._query_futures[query]
+                future.set_exception(e)
+
+        return future.result()
+
+    def _query_dblp_uncached(self, query: str) -> Dict:
+        """Query DBLP, raising _LookupFailed so failures aren't cached."""
+        data = self._make_request_with_retry(
+            {
+                "q": query,
+                "format": "json",
+                "h": 5,  # Get more results to check author matches
+            }
+        )
+        if data is None:
+            raise _LookupFailed(query)
+        return data
+
     def search_publication(self, title: str, authors: List[str]) -> Optional[Dict]:
         """Search for a publication in DBLP using title and authors."""
         # Construct query string
         query_parts = [title]
         if authors:
             query_parts.extend(authors[:2])  # Use first two authors
-        query = " ".join(query_parts)
+        # Case and whitespace don't change DBLP results, so fold them for
+        # the query and the in-memory cache key
+        query = " ".join(" ".join(query_parts).lower().split())
 
         # URL encode the query
         encoded_query = quote(query)
 
         try:
-            # Make request with retry logic
-            data = self._make_request_with_retry(
-                {
-                    "q": query,
-                    "format": "json",
-                    "h": 5,  # Get more results to check author matches
-                }
-            )
+            # Make request with retry logic, reusing duplicate queries
+            try:
+                data = self._query_dblp(query)
+            except _LookupFailed:
+                return None
 
             if not data:
                 return None
 
             # Log the raw response for debugging
-            logging.debug(f"DBLP Response: {json.dumps(data, indent=2)}")
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+                logging.debug("DBLP Response: %s", _json_dumps_indented(data))
 
             # Check if we got any hits
             hits = data.get("result", {}).get("hits", {}).get("hit", [])
             if not hits:
                 return None
 
-            # Get DBLP info from the first hit
-            dblp_info = hits[0].get("info", {})
-            dblp_authors = []
-            dblp_title = dblp_info.get("title", "")
+            # Normalize the BibTeX authors once for all hits
+            norm_authors = [self._normalize_name(a) for a in authors]
+
+            # Rank every returned hit, not just the first one
+            best_info = None
+            best_score = 0.0
+            for hit in hits[:5]:
+                dblp_info = hit.get("info", {})
+                dblp_title = dblp_info.get("title", "")
+
+                # Compare titles first
+                title_similarity = self._compare_titles(title, dblp_title)
+                if title_similarity < 0.7:  # Threshold for title match
+                    logging.debug(
+                        f"Title similarity too low ({title_similarity:.2f}), skipping hit"
+                    )
+                    continue
 
-            # Compare titles first
-            title_similarity = self._compare_titles(title, dblp_title)
-            if title_similarity < 0.7:  # Threshold for title match
-                logging.warning(
-                    f"Title similarity too low ({title_similarity:.2f}), rejecting match"
-                )
-                return None
+                # Log the info structure for debugging
+                if logging.getLogger().isEnabledFor(logging.DEBUG):
+                    logging.debug("DBLP Info: %s", _json_dumps_indented(dblp_info))
 
-            # Log the info structure for debugging
-            logging.debug(f"DBLP Info: {json.dumps(dblp_info, indent=2)}")
+                # Handle different possible author formats in DBLP response
+                authors_field = dblp_info.get("authors")
+                if authors_field is None:
+                    logging.warning("No authors field found in DBLP response")
+                    continue
 
-            # Handle different possible author formats in DBLP response
-            authors_field = dblp_info.get("authors")
-            if authors_field is None:
-                logging.warning("No authors field found in DBLP response")
-                return None
+                # Log the authors field type and content
+                logging.debug("Authors field type: %s", type(authors_field))
+                logging.debug("Authors field content: %s", authors_field)
 
-            # Log the authors field type and content
-            logging.debug(f"Authors field type: {type(authors_field)}")
-            logging.debug(f"Authors field content: {authors_field}")
-
-            if isinstance(authors_field, str):
-                dblp_authors = authors_field.split(" and ")
-            elif isinstance(authors_field, list):
-                # Handle list of author objects
-                dblp_authors = []
-                for author in authors_field:
-                    if isinstance(author, dict):
-                        dblp_authors.append(author.get("text", ""))
-                    elif isinstance(author, str):
-                        dblp_authors.append(author)
-                    elif isinstance(author, list):
-                        # Handle nested list of authors
-                        for subauthor in author:
-                            if isinstance(subauthor, dict):
-                                dblp_authors.append(subauthor.get("text", ""))
-                            elif isinstance(subauthor, str):
-                                dblp_authors.append(subauthor)
-                    else:
-                        logging.warning(f"Unexpected author type: {type(author)}")
-                        continue
-            elif isinstance(authors_field, dict):
-                # Handle dictionary of author objects
-                dblp_authors = []
-                for author in authors_field.values():
-                    if isinstance(author, dict):
-                        dblp_authors.append(author.get("text", ""))
-                    elif isinstance(author, str):
-                        dblp_authors.append(author)
-                    elif isinstance(author, list):
-                        # Handle nested list of authors
-                        for subauthor in author:
-                            if isinstance(subauthor, dict):
-                                dblp_authors.append(subauthor.get("text", ""))
-                            elif isinstance(subauthor, str):
-                                dblp_authors.append(subauthor)
-                    else:
-                        logging.warning(
-                            f"Unexpected author type in dict: {type(author)}"
-                        )
-                        continue
-            else:
-                logging.warning(f"Unexpected authors field type: {type(authors_field)}")
-                return None
+                # Flatten the (possibly nested) authors payload into names
+                dblp_authors = list(_iter_author_texts(authors_field))
 
-            # Filter out empty author names
-            dblp_authors = [a for a in dblp_authors if a.strip()]
+                if not dblp_authors:
+                    logging.warning("No valid authors found in DBLP response")
+                    continue
 
-            if not dblp_authors:
-                logging.warning("No valid authors found in DBLP response")
-                return None
+                # Compare authors
+                author_similarity = self._compare_authors_norm(
+                    norm_authors, [self._normalize_name(a) for a in dblp_authors]
+                )
+
+                # Log the comparison
+                logging.info(f"Author similarity: {author_similarity:.2f}")
+                logging.info(f"Original authors: {authors}")
+                logging.info(f"DBLP authors: {dblp_authors}")
 
-            # Compare authors
-            author_similarity = self._compare_authors(authors, dblp_authors)
+                # If author similarity is too low, skip this hit
+                if author_similarity < 0.4:  # Threshold for considering a match
+                    logging.debug("Author similarity too low, skipping hit")
+                    continue
 
-            # Log the comparison
-            logging.info(f"Author similarity: {author_similarity:.2f}")
-            logging.info(f"Original authors: {authors}")
-            logging.info(f"DBLP authors: {dblp_authors}")
+                # Prefer the hit with the best combined title/author score
+                score = 0.6 * title_similarity + 0.4 * author_similarity
+                if score > best_score:
+                    best_info = dblp_info
+                    best_score = score
+                    if score >= 1.0:  # Can't do better than a perfect match
+                        break
 
-            # If author similarity is too low, return None
-            if author_similarity < 0.4:  # Threshold for considering a match
-                logging.warning("Author similarity too low, rejecting match")
-                return None
+            if best_info is None:
+                logging.warning("No DBLP hit matched title and authors, rejecting")
 
-            return dblp_info
+            return best_info
 
         except Exception as e:
             logging.error(f"Error searching DBLP: {e}")
@@ -306,16 +497,124 @@ class DBLPSearcher:
 
 def load_processed_entries(log_file: str) -> Set[str]:
     """Load already processed entries from the log file."""
-    processed = set()
-    if os.path.exists(log_file):
-        with open(log_file, "r", encoding="utf-8") as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                processed.add(row["Original Key"])
-    return processed
+    if not os.path.exists(log_file):
+        return set()
+
+    with open(log_file, "r", newline="", encoding="utf-8") as csvfile:
+        reader = csv.reader(csvfile)
+        header = next(reader, None)
+        if header is None:
+            return set()
+        key_idx = header.index("Original Key")
+        return {row[key_idx] for row in reader if row}
+
+
+def _field_text(value) -> str:
+    """Return a field's text, expanding any @string macros it still holds."""
+    if isinstance(value, str):
+        return value
+    try:
+        return as_text(value)
+    except UndefinedString:
+        # Macro without a definition (e.g. "jan"), keep its name
+        return "".join(
+            part if isinstance(part, str) else part.name for part in value.expr
+        )
+
+
+def _parse_entry_authors(entry: Dict) -> List[str]:
+    """Split the BibTeX author field into a list of names."""
+    if "author" not in entry:
+        return []
+    # Replace newlines with spaces
+    author_str = _field_text(entry["author"]).replace("\n", " ")
+    # Split by 'and' and clean up
+    return [a.strip() for a in author_str.split(" and ") if a.strip()]
+
+
+def _apply_dblp_info(entry: Dict, dblp_info: Dict, authors: List[str]):
+    """Update a BibTeX entry in place with the fields found on DBLP."""
+    # Keep the original key
+    entry_key = entry.get("ID", "")
+    entry["ID"] = entry_key
+
+    # Convert DBLP authors to string format
+    dblp_authors = " and ".join(_iter_author_texts(dblp_info.get("authors")))
+
+    # Log the authors for debugging
+    logging.info(f"Original authors: {authors}")
+    logging.info(f"DBLP authors: {dblp_authors}")
+
+    # Update other fields with DBLP info
+    entry.update(
+        {
+            "title": dblp_info.get("title", entry.get("title", "")),
+            "author": dblp_authors,  # Make sure we save the authors
+            "year": dblp_info.get("year", entry.get("year", "")),
+            "journal": dblp_info.get("venue", entry.get("journal", "")),
+            "booktitle": dblp_info.get("venue", entry.get("booktitle", "")),
+            "volume": dblp_info.get("volume", entry.get("volume", "")),
+            "number": dblp_info.get("number", entry.get("number", "")),
+            "pages": dblp_info.get("pages", entry.get("pages", "")),
+            "url": dblp_info.get("ee", entry.get("url", "")),
+            "doi": dblp_info.get("doi", entry.get("doi", "")),
+            "dblp_key": dblp_info.get("key", ""),
+        }
+    )
 
+    # DBLP returns a list for fields with several values (e.g. "ee" for a
+    # paper with multiple electronic editions), but BibTeX needs strings
+    for field, value in entry.items():
+        if isinstance(value, list):
+            sep = " " if field == "url" else ", "
+            entry[field] = sep.join(str(v) for v in value)
+
+
+def _checkpoint_writer(
+    write_queue: queue.Queue,
+    write_errors: List[Exception],
+    csvfile,
+    csvwriter,
+    bibtex_file,
+):
+    """Write queued (CSV row, entry) checkpoints until a None item arrives."""
+    while True:
+        item = write_queue.get()
+        try:
+            if item is None:
+                return
+            # After a failed write, drain the queue without writing so the
+            # main thread can re-raise the stored error
+            if write_errors:
+                continue
+            csv_row, entry = item
 
-def process_bibtex(input_file: str, output_file: str, log_file: str):
+            # Append only the new entry to the output file
+            entry_db = BibDatabase()
+            entry_db.entries = [entry]
+            if bibtex_file.tell() > 0:
+                bibtex_file.write("\n")  # Blank line between entries
+            bibtexparser.dump(entry_db, bibtex_file)
+            bibtex_file.flush()
+            os.fsync(bibtex_file.fileno())
+
+            # Log the result
+            csvwriter.writerow(csv_row)
+            csvfile.flush()
+        except Exception as e:
+            logging.error(f"Failed to write checkpoint: {e}")
+            write_errors.append(e)
+        finally:
+            write_queue.task_done()
+
+
+def process_bibtex(
+    input_file: str,
+    output_file: str,
+    log_file: str,
+    max_workers: int = 4,
+    batch_size: int = 15,
+):
     """Process BibTeX file and find DBLP entries."""
     # Initialize DBLP searcher
     searcher = DBLPSearcher()
@@ -326,23 +625,44 @@ def process_bibtex(input_file: str, output_file: str, log_file: str):
 
     # Read input BibTeX file
     with open(input_file, "r", encoding="utf-8") as bibtex_file:
-        bib_database = bibtexparser.load(bibtex_file)
-
-    # Prepare output BibTeX entries
-    output_entries = []
-
-    # If output file exists, load existing entries
-    if os.path.exists(output_file):
-        with open(output_file, "r", encoding="utf-8") as bibtex_file:
-            existing_db = bibtexparser.load(bibtex_file)
-            output_entries = existing_db.entries
-            logging.info(
-                f"Loaded {len(output_entries)} existing entries from output file"
-            )
+        # Only title, author and ID are needed for the lookup, so skip string
+        # interpolation and leave @string macros as they are
+        parser = BibTexParser(
+            common_strings=False, interpolate_strings=False, homogenize_fields=False
+        )
+        parser.customization = None
+        bib_database = bibtexparser.load(bibtex_file, parser=parser)
+
+    # Collect the entries that still need a DBLP lookup
+    total_entries = len(bib_database.entries)
+    pending = []
+    for idx, entry in enumerate(bib_database.entries, 1):
+        entry_key = entry.get("ID", "")
+
+        # Skip if already processed
+        if entry_key in processed_entries:
+            logging.info(f"Skipping already processed entry: {entry_key}")
+            continue
+
+        pending.append((idx, entry))
 
     # Prepare CSV log
     log_mode = "a" if os.path.exists(log_file) else "w"
-    with open(log_file, log_mode, newline="", encoding="utf-8") as csvfile:
+    # Entries from earlier runs stay in the output file, new ones are appended
+    with open(log_file, log_mode, newline="", encoding="utf-8") as csvfile, open(
+        output_file, "a", encoding="utf-8"
+    ) as bibtex_file:
+        # A fresh output file gets the input's @comment, @preamble and @string
+        # blocks, since the appended entries may rely on their macros
+        if bibtex_file.tell() == 0 and (
+            bib_database.comments or bib_database.preambles or bib_database.strings
+        ):
+            header_db = BibDatabase()
+            header_db.comments = bib_database.comments
+            header_db.preambles = bib_database.preambles
+            header_db.strings = bib_database.strings
+            bibtex_file.write(bibtexparser.dumps(header_db).rstrip("\n") + "\n")
+
         csvwriter = csv.writer(csvfile)
         if log_mode == "w":  # Only write header for new file
             csvwriter.writerow(
@@ -356,124 +676,83 @@ def process_bibtex(input_file: str, output_file: str, log_file: str):
                 ]
             )
 
-        # Process each entry
-        total_entries = len(bib_database.entries)
         processed_count = 0
 
-        for idx, entry in enumerate(bib_database.entries, 1):
-            entry_key = entry.get("ID", "")
-
-            # Skip if already processed
-            if entry_key in processed_entries:
-                logging.info(f"Skipping already processed entry: {entry_key}")
-                continue
-
-            logging.info(f"Processing entry {idx}/{total_entries}: {entry_key}")
-
-            # Extract title and authors
-            title = entry.get("title", "")
-
-            # Handle author parsing
-            authors = []
-            if "author" in entry:
-                author_str = entry["author"]
-                # Replace newlines with spaces
-                author_str = author_str.replace("\n", " ")
-                # Split by 'and' and clean up
-                authors = [a.strip() for a in author_str.split(" and ") if a.strip()]
-
-            # Search DBLP
-            dblp_info = searcher.search_publication(title, authors)
+        # Checkpoints are written on a background thread, overlapping the I/O
+        # with the next DBLP requests
+        write_queue = queue.Queue(maxsize=4)
+        write_errors = []
+        writer = threading.Thread(
+            target=_checkpoint_writer,
+            args=(write_queue, write_errors, csvfile, csvwriter, bibtex_file),
+            daemon=True,
+        )
+        writer.start()
 
-            # Log the result
-            csvwriter.writerow(
-                [
-                    entry_key,
-                    title,
-                    "; ".join(authors),
-                    "Yes" if dblp_info else "No",
-                    dblp_info.get("key", "") if dblp_info else "",
-                    dblp_info.get("title", "") if dblp_info else "",
-                ]
-            )
-
-            # If DBLP entry found, update the entry
-            if dblp_info:
-                # Keep the original key
-                entry["ID"] = entry_key
-
-                # Convert DBLP authors to string format
-                dblp_authors = dblp_info.get("authors", "")
-                if isinstance(dblp_authors, list):
-                    # Handle list of author dictionaries with @pid and text fields
-                    if dblp_authors and isinstance(dblp_authors[0], dict):
-                        dblp_authors = " and ".join(
-                            author.get("text", str(author)) for author in dblp_authors
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                # Look up each batch concurrently, the searcher paces its own requests
+                for start in range(0, len(pending), batch_size):
+                    futures = []
+                    for idx, entry in pending[start : start + batch_size]:
+                        logging.info(
+                            f"Processing entry {idx}/{total_entries}: {entry.get('ID', '')}"
                         )
-                    else:
-                        dblp_authors = " and ".join(str(a) for a in dblp_authors)
-                elif isinstance(dblp_authors, dict):
-                    # Handle dictionary of author objects
-                    author_texts = []
-                    for author in dblp_authors.values():
-                        if isinstance(author, dict):
-                            author_texts.append(author.get("text", str(author)))
-                        elif isinstance(author, str):
-                            author_texts.append(author)
-                        elif isinstance(author, list):
-                            # Handle nested list of authors
-                            for subauthor in author:
-                                if isinstance(subauthor, dict):
-                                    author_texts.append(
-                                        subauthor.get("text", str(subauthor))
-                                    )
-                                elif isinstance(subauthor, str):
-                                    author_texts.append(subauthor)
-                    dblp_authors = " and ".join(author_texts)
-                else:
-                    dblp_authors = str(dblp_authors)
-
-                # Log the authors for debugging
-                logging.info(f"Original authors: {authors}")
-                logging.info(f"DBLP authors: {dblp_authors}")
-
-                # Update other fields with DBLP info
-                entry.update(
-                    {
-                        "title": dblp_info.get("title", entry.get("title", "")),
-                        "author": dblp_authors,  # Make sure we save the authors
-                        "year": dblp_info.get("year", entry.get("year", "")),
-                        "journal": dblp_info.get("venue", entry.get("journal", "")),
-                        "booktitle": dblp_info.get("venue", entry.get("booktitle", "")),
-                        "volume": dblp_info.get("volume", entry.get("volume", "")),
-                        "number": dblp_info.get("number", entry.get("number", "")),
-                        "pages": dblp_info.get("pages", entry.get("pages", "")),
-                        "url": dblp_info.get("ee", entry.get("url", "")),
-                        "doi": dblp_info.get("doi", entry.get("doi", "")),
-                        "dblp_key": dblp_info.get("key", ""),
-                    }
-                )
-
-            # Add to output entries
-            output_entries.append(entry)
 
-            # Save checkpoint after each entry
-            with open(output_file, "w", encoding="utf-8") as bibtex_file:
-                bib_database.entries = output_entries  # Update the entries
-                bibtexparser.dump(bib_database, bibtex_file)
+                        # Extract title and authors
+                        title = _field_text(entry.get("title", ""))
+                        authors = _parse_entry_authors(entry)
 
-            # Add a small delay to avoid overwhelming the API
-            time.sleep(0.5)
-
-            # Increment processed count and check if we should prompt
-            processed_count += 1
-            if processed_count % 15 == 0:
-                response = input(
-                    f"\nProcessed {processed_count} entries. Continue? (Y/N): "
-                )
-                if response.lower() != "y":
-                    logging.info("User chose to stop processing.")
-                    break
+                        # Search DBLP
+                        future = executor.submit(
+                            searcher.search_publication, title, authors
+                        )
+                        futures.append((entry, title, authors, future))
+
+                    # Write results in submission order so the output is deterministic
+                    for entry, title, authors, future in futures:
+                        entry_key = entry.get("ID", "")
+                        dblp_info = future.result()
+
+                        # If DBLP entry found, update the entry
+                        if dblp_info:
+                            _apply_dblp_info(entry, dblp_info, authors)
+
+                        # Hand the checkpoint to the writer thread and move on
+                        csv_row = [
+                            entry_key,
+                            title,
+                            "; ".join(authors),
+                            "Yes" if dblp_info else "No",
+                            dblp_info.get("key", "") if dblp_info else "",
+                            dblp_info.get("title", "") if dblp_info else "",
+                        ]
+                        if write_errors:
+                            raise write_errors[0]
+                        write_queue.put((csv_row, entry))
+
+                        processed_count += 1
+
+                    # Check if we should prompt after each batch
+                    if start + batch_size < len(pending):
+                        # Make sure everything so far is on disk before asking
+                        write_queue.join()
+                        if write_errors:
+                            raise write_errors[0]
+                        response = input(
+                            f"\nProcessed {processed_count} entries. Continue? (Y/N): "
+                        )
+                        if response.lower() != "y":
+                            logging.info("User chose to stop processing.")
+                            break
+        finally:
+            # Wait for all checkpoints to land before closing the files
+            write_queue.put(None)
+            writer.join()
+
+        # Stop the run if a checkpoint could not be written
+        if write_errors:
+            raise write_errors[0]
 
     logging.info(
         f"Processing complete. Check {output_file} and {log_file} for results."
@@ -1,11 +1,29 @@
+import csv
+import os
+import tempfile
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 import bibtexparser
-from bibtex2dblp import DBLPSearcher
+from bibtex2dblp import (
+    DBLPSearcher,
+    _iter_author_texts,
+    load_processed_entries,
+    process_bibtex,
+)
 
 
 class TestBibtex2DBLP(unittest.TestCase):
     def setUp(self):
-        self.searcher = DBLPSearcher()
+        # Keep the response cache out of the working directory so tests
+        # always hit DBLP and don't leave a dblp_cache.sqlite behind
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.searcher = DBLPSearcher(
+            cache_name=os.path.join(self.tmpdir.name, "dblp_cache")
+        )
+        self.addCleanup(self.searcher.session.close)
 
         # Reference DBLP entry
         self.dblp_reference = {
@@ -47,6 +65,15 @@ class TestBibtex2DBLP(unittest.TestCase):
         similarity = self.searcher._compare_titles(title, self.dblp_reference["title"])
         self.assertGreaterEqual(similarity, 0.7)
 
+    def test_title_matching_with_subtitle(self):
+        """Test that a title missing its subtitle can still match"""
+        # Lengths differ by more than 0.7x, but the best possible ratio
+        # 2 * min / (l1 + l2) is still above the threshold
+        title = "PyTorch: An Imperative Style, High-Performance Deep Learning"
+        dblp_title = title + " Library for Everyone Today"
+        similarity = self.searcher._compare_titles(title, dblp_title)
+        self.assertGreaterEqual(similarity, 0.7)
+
     def test_author_matching(self):
         """Test if author matching works correctly"""
         authors = [
@@ -77,6 +104,32 @@ class TestBibtex2DBLP(unittest.TestCase):
         )
         self.assertGreaterEqual(similarity, 0.4)
 
+    def test_author_matching_pairwise(self):
+        """Test the pairwise matcher when the leading authors differ"""
+        reference = self.dblp_reference["authors"]
+
+        # Reordered list with a shortened first name and a misspelled
+        # surname, so the leading-author shortcut doesn't apply
+        authors = [
+            a.replace("Zachary", "Zach").replace("Chintala", "Chintalla")
+            for a in reversed(reference)
+        ]
+        similarity = self.searcher._compare_authors(authors, reference)
+        self.assertGreater(similarity, 0.9)
+        self.assertLess(similarity, 1.0)
+
+        # A last-name bucket without a good match falls back to all authors
+        similarity = self.searcher._compare_authors(
+            ["John Smith Jr"], ["Bob Jones Jr", "John Smith"]
+        )
+        self.assertGreater(similarity, 0.8)
+
+        # Shared surnames alone aren't enough to match
+        similarity = self.searcher._compare_authors(
+            ["Xavier Paszke", "Yolanda Gross"], ["Adam Paszke", "Sam Gross"]
+        )
+        self.assertLess(similarity, 0.4)
+
     def test_name_normalization(self):
         """Test if name normalization works correctly"""
         # Test various name formats
@@ -86,6 +139,10 @@ class TestBibtex2DBLP(unittest.TestCase):
             ("Yang, Edward", "Edward Yang"),
             ("Yang, Edward Z.", "Edward Z Yang"),  # Remove period after initial
             ("Edward Z Yang", "Edward Z Yang"),
+            ("Andreas Köpf", "Andreas Kopf"),  # Fold accents
+            ("Köpf, Andreas", "Andreas Kopf"),
+            ("ab_c", "ab_c"),  # ASCII and non-ASCII paths agree on "_"
+            ("ab_c ж", "ab_c ж"),
         ]
 
         for input_name, expected in test_cases:
@@ -138,6 +195,230 @@ class TestBibtex2DBLP(unittest.TestCase):
         )
         self.assertIsNone(result)
 
+    def test_invalid_json_response(self):
+        """Test that a non-JSON response body is treated as a failed request"""
+        response = mock.Mock(content=b"<html>Maintenance</html>", from_cache=True)
+        with mock.patch.object(self.searcher.session, "get", return_value=response):
+            self.assertIsNone(self.searcher._make_request_with_retry({"q": "x"}))
+
+    def test_query_deduplication(self):
+        """Test that duplicate queries are cached, but failed ones are retried"""
+        title = self.dblp_reference["title"]
+        authors = self.dblp_reference["authors"]
+        response = {"result": {"hits": {"hit": []}}}
+
+        with mock.patch.object(
+            self.searcher, "_make_request_with_retry", side_effect=[None, response]
+        ) as request:
+            # A failed lookup is not cached...
+            self.assertIsNone(self.searcher.search_publication(title, authors))
+            self.assertIsNone(self.searcher.search_publication(title, authors))
+            self.assertEqual(request.call_count, 2)
+
+            # ...but a successful one is reused for the same normalized query
+            self.searcher.search_publication(title.upper(), authors)
+            self.assertEqual(request.call_count, 2)
+
+    def test_concurrent_query_deduplication(self):
+        """Test that concurrent duplicate queries share one DBLP request"""
+        response = {"result": {"hits": {"hit": []}}}
+
+        def slow_request(params):
+            time.sleep(0.1)  # Keep the first request in flight
+            return response
+
+        with mock.patch.object(
+            self.searcher, "_make_request_with_retry", side_effect=slow_request
+        ) as request, ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [
+                executor.submit(self.searcher.search_publication, "Same Title", ["A B"])
+                for _ in range(4)
+            ]
+            for future in futures:
+                self.assertIsNone(future.result())
+
+        self.assertEqual(request.call_count, 1)
+
+    def test_best_hit_selection(self):
+        """Test that the best matching hit is picked, not just the first one"""
+        title = self.dblp_reference["title"]
+        authors = self.dblp_reference["authors"]
+        hits = [
+            {"info": {"title": "Unrelated", "authors": "Adam Paszke", "key": "a"}},
+            {
+                "info": {
+                    "title": title,
+                    "authors": {"author": [{"text": "Someone Else"}]},
+                    "key": "b",
+                }
+            },
+            {
+                "info": {
+                    "title": title + ".",
+                    "authors": {"author": [{"text": a} for a in authors]},
+                    "key": self.dblp_reference["key"],
+                }
+            },
+        ]
+        response = {"result": {"hits": {"hit": hits}}}
+
+        with mock.patch.object(
+            self.searcher, "_make_request_with_retry", return_value=response
+        ):
+            dblp_info = self.searcher.search_publication(title, authors)
+
+        self.assertIsNotNone(dblp_info)
+        self.assertEqual(dblp_info["key"], self.dblp_reference["key"])
+
+    def test_author_payload_parsing(self):
+        """Test flattening the different DBLP author payload shapes"""
+        test_cases = [
+            ("Adam Paszke and Sam Gross", ["Adam Paszke", "Sam Gross"]),
+            ({"author": {"@pid": "1", "text": "Adam Paszke"}}, ["Adam Paszke"]),
+            (
+                {"author": [{"@pid": "1", "text": "Adam Paszke"}, "Sam Gross"]},
+                ["Adam Paszke", "Sam Gross"],
+            ),
+            (
+                [[{"text": "Adam Paszke"}], {"text": "Sam Gross"}, " "],
+                ["Adam Paszke", "Sam Gross"],
+            ),
+            (None, []),
+        ]
+
+        for payload, expected in test_cases:
+            self.assertEqual(list(_iter_author_texts(payload)), expected)
+
+    def test_load_processed_entries(self):
+        """Test reading processed keys back from the CSV log"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            log_file = os.path.join(tmpdir, "log.csv")
+
+            # Missing and empty logs have no processed entries
+            self.assertEqual(load_processed_entries(log_file), set())
+            open(log_file, "w").close()
+            self.assertEqual(load_processed_entries(log_file), set())
+
+            with open(log_file, "w", encoding="utf-8") as f:
+                f.write("Original Key,Title,Authors,DBLP Found,DBLP Key,DBLP Title\n")
+                f.write('paszke2019,"PyTorch: A, B",Adam Paszke,Yes,conf/nips/X,T\n')
+                f.write("other2020,Other,John Doe,No,,\n")
+            self.assertEqual(
+                load_processed_entries(log_file), {"paszke2019", "other2020"}
+            )
+
+    def _run_process_bibtex(self, search_results, bibtex=None):
+        """Run process_bibtex on two entries with a mocked DBLP search"""
+        input_file = os.path.join(self.tmpdir.name, "input.bib")
+        output_file = os.path.join(self.tmpdir.name, "output.bib")
+        log_file = os.path.join(self.tmpdir.name, "log.csv")
+        if bibtex is None:
+            bibtex = (
+                "@misc{paszke2019,\n"
+                " title = {PyTorch: An Imperative Style, High-Performance"
+                " Deep Learning Library},\n"
+                " author = {Adam Paszke and Sam Gross},\n}\n\n"
+                "@misc{other2020,\n title = {Other Paper},\n author = {John Doe},\n}\n"
+            )
+        with open(input_file, "w", encoding="utf-8") as f:
+            f.write(bibtex)
+
+        with mock.patch("bibtex2dblp.DBLPSearcher") as searcher_cls:
+            searcher_cls.return_value.search_publication.side_effect = search_results
+            try:
+                process_bibtex(input_file, output_file, log_file)
+            finally:
+                with open(output_file, encoding="utf-8") as f:
+                    output_db = bibtexparser.load(f)
+                with open(log_file, encoding="utf-8", newline="") as f:
+                    log_rows = list(csv.reader(f))
+        return output_db, log_rows
+
+    def test_process_bibtex(self):
+        """Test that found and missing entries end up in the .bib and CSV"""
+        dblp_info = dict(self.dblp_reference)
+        dblp_info["authors"] = {
+            "author": [{"text": a} for a in self.dblp_reference["authors"]]
+        }
+        # DBLP returns a list when a paper has several electronic editions
+        dblp_info["ee"] = [
+            self.dblp_reference["ee"],
+            "https://arxiv.org/abs/1912.01703",
+        ]
+
+        output_db, log_rows = self._run_process_bibtex([dblp_info, None])
+
+        entries = {e["ID"]: e for e in output_db.entries}
+        self.assertEqual(set(entries), {"paszke2019", "other2020"})
+        self.assertEqual(entries["paszke2019"]["dblp_key"], self.dblp_reference["key"])
+        self.assertEqual(
+            entries["paszke2019"]["url"],
+            self.dblp_reference["ee"] + " https://arxiv.org/abs/1912.01703",
+        )
+        self.assertTrue(entries["paszke2019"]["author"].startswith("Adam Paszke and"))
+        self.assertEqual(entries["other2020"]["title"], "Other Paper")
+
+        self.assertEqual(log_rows[0][0], "Original Key")
+        self.assertEqual(
+            [(row[0], row[3], row[4]) for row in log_rows[1:]],
+            [
+                ("paszke2019", "Yes", self.dblp_reference["key"]),
+                ("other2020", "No", ""),
+            ],
+        )
+
+    def test_process_bibtex_string_macros(self):
+        """Test that @string macros are expanded for lookup and kept in the output"""
+        bibtex = (
+            "@comment{Converted references}\n\n"
+            '@preamble{"\\newcommand{\\noopsort}[1]{}"}\n\n'
+            "@string{pt = {PyTorch}}\n"
+            "@string{ap = {Adam Paszke}}\n\n"
+            "@misc{paszke2019,\n"
+            ' title = pt # ": An Imperative Style",\n'
+            ' author = ap # " and Sam Gross",\n'
+            " month = jan,\n}\n\n"
+            "@misc{other2020,\n title = {Other Paper},\n author = {John Doe},\n}\n"
+        )
+
+        output_db, log_rows = self._run_process_bibtex([None, None], bibtex)
+
+        # Titles and authors are looked up with their macros expanded
+        self.assertEqual(
+            [(row[0], row[1], row[2]) for row in log_rows[1:]],
+            [
+                (
+                    "paszke2019",
+                    "PyTorch: An Imperative Style",
+                    "Adam Paszke; Sam Gross",
+                ),
+                ("other2020", "Other Paper", "John Doe"),
+            ],
+        )
+
+        # The header blocks are carried over so the macros still resolve
+        self.assertEqual(output_db.comments, ["Converted references"])
+        self.assertEqual(output_db.preambles, ["\\newcommand{\\noopsort}[1]{}"])
+        self.assertEqual(output_db.strings["pt"], "PyTorch")
+        self.assertEqual(output_db.strings["ap"], "Adam Paszke")
+
+        entries = {e["ID"]: e for e in output_db.entries}
+        self.assertEqual(entries["paszke2019"]["title"], "PyTorch: An Imperative Style")
+        self.assertEqual(entries["paszke2019"]["author"], "Adam Paszke and Sam Gross")
+        self.assertEqual(entries["paszke2019"]["month"], "January")
+
+    def test_process_bibtex_write_failure(self):
+        """Test that a failed checkpoint write stops the run"""
+        with mock.patch(
+            "bibtex2dblp.bibtexparser.dump", side_effect=ValueError("bad entry")
+        ):
+            with self.assertRaises(ValueError):
+                self._run_process_bibtex([None, None])
+
+        # Nothing was logged as processed, so a rerun retries both entries
+        log_file = os.path.join(self.tmpdir.name, "log.csv")
+        self.assertEqual(load_processed_entries(log_file), set())
+
 
 if __name__ == "__main__":
     unittest.main()